@@ -2,7 +2,7 @@ import tomllib as toml
 from typing import Literal
 from typing_extensions import Self
 
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, ConfigDict, PositiveInt, model_validator
 
 
 class FilterExamples(BaseModel):
@@ -16,20 +16,27 @@ class FilterConfig(BaseModel):
 
 
 class InteractionRulesConfig(BaseModel):
-    do: list[str]
-    dont: list[str]
+    model_config = ConfigDict(frozen=True)
+
+    do: tuple[str, ...]
+    dont: tuple[str, ...]
 
 
 class EngineConfig(BaseModel):
-    world_properties: list[str]
-    core_mechanics: list[str]
+    # Frozen so that it is hashable and prompt rendering can be memoized on it.
+    model_config = ConfigDict(frozen=True)
+
+    world_properties: tuple[str, ...]
+    core_mechanics: tuple[str, ...]
     interaction_rules: InteractionRulesConfig
-    response_guidelines: list[str]
+    response_guidelines: tuple[str, ...]
 
 
 class GameConfig(BaseModel):
     filter: FilterConfig
     engine: EngineConfig
+    # Upper bound on in-flight requests to each model provider
+    max_concurrent_requests: PositiveInt = 16
 
 
 class DiscordFrontendConfig(BaseModel):
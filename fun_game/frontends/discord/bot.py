@@ -1,4 +1,5 @@
 from __future__ import annotations
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -52,16 +53,31 @@ class Bot(commands.Bot):
             await self.load_extension(ext)
         await self.tree.sync()
 
+    async def close(self):
+        await super().close()
+        for guild_state in self.guild_states.values():
+            guild_state.game_engine.close()
+        self.guild_states.clear()
+
     async def on_ready(self):
         logger.info("Bot connected as %s", self.user)
-        for guild in self.guilds:
-            await self.on_guild_join(guild)
-
-    async def on_guild_join(self, guild):
-        guild_state = GuildState(
-            guild.id, game_engine=self._engine_factory(f"discord_guild_{guild.id}")
+        # Channel lookups and creation for each guild are independent.
+        # A failure is logged and doesn't stop the other guilds from being set up.
+        guilds = list(self.guilds)
+        results = await asyncio.gather(
+            *(self.on_guild_join(guild) for guild in guilds), return_exceptions=True
         )
+        for guild, result in zip(guilds, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Failed to initialize guild %s (ID: %s): %s",
+                    guild.name,
+                    guild.id,
+                    result,
+                    exc_info=result,
+                )
 
+    async def on_guild_join(self, guild):
         # Look for existing channel
         channel = discord.utils.get(guild.channels, name=self._config.channel_name)
         if not channel:
@@ -79,6 +95,15 @@ class Bot(commands.Bot):
 
         if not isinstance(channel, discord.TextChannel):
             return
-        guild_state.game_channel = channel
+
+        # The engine owns a database connection, so it's only made once the guild is usable
+        guild_state = GuildState(
+            guild.id,
+            game_engine=self._engine_factory(f"discord_guild_{guild.id}"),
+            game_channel=channel,
+        )
+        # `on_ready` runs again after a reconnect
+        if previous := self.guild_states.get(guild.id):
+            previous.game_engine.close()
         self.guild_states[guild.id] = guild_state
         logger.info("Initialized guild state for %s (ID: %s)", guild.name, guild.id)
@@ -13,6 +13,9 @@ from fun_game.frontends.discord import Bot, GuildState
 logger = logging.getLogger("bot.cogs.message_handler")
 logger.setLevel(logging.DEBUG)
 
+# The most queued messages to classify at once
+_MAX_BATCH_SIZE = 16
+
 
 class MessageHandler(commands.Cog):
     def __init__(self, bot: Bot):
@@ -30,7 +33,7 @@ class MessageHandler(commands.Cog):
             or message.channel.id != guild_state.game_channel.id
         ):
             return
-        await guild_state.message_queue.put(message)
+        guild_state.put_message(message)
         if not self._processing[message.guild.id]:
             self.bot.loop.create_task(self.process_messages(message.guild.id))
             self._processing[message.guild.id] = True
@@ -39,25 +42,61 @@ class MessageHandler(commands.Cog):
         guild_state = self.bot.guild_states[guild_id]
         try:
             while True:
-                message = await guild_state.message_queue.get()
-                logger.debug("processing message")
-                try:
-                    await self.handle_message(message, guild_state)
-                except Exception as e:
-                    logger.error(
-                        f"error processing message in guild %s: %s",
-                        guild_id,
-                        e,
-                        exc_info=True,
-                    )
-                finally:
-                    guild_state.message_queue.task_done()
+                batch = await guild_state.get_messages(_MAX_BATCH_SIZE)
+                logger.debug("processing %d messages", len(batch))
+                await self.handle_messages(batch, guild_state)
         except asyncio.CancelledError:
             pass
 
-    async def handle_message(self, message: discord.Message, guild_state: GuildState):
+    async def handle_messages(
+        self, messages: list[discord.Message], guild_state: GuildState
+    ):
+        """
+        Classifies a batch of messages concurrently, then processes them in order.
+        """
+        contexts = await asyncio.gather(
+            *(self.make_context(message) for message in messages),
+            return_exceptions=True,
+        )
+        verdicts = await asyncio.gather(
+            *(
+                self._classify(context, guild_state)
+                for context in contexts
+                if isinstance(context, GameContext)
+            ),
+            return_exceptions=True,
+        )
+
+        verdict_iter = iter(verdicts)
+        for message, context in zip(messages, contexts):
+            if context is None:
+                continue
+            try:
+                if isinstance(context, BaseException):
+                    raise context
+                is_action = next(verdict_iter)
+                if isinstance(is_action, BaseException):
+                    raise is_action
+                await do_handle_message(
+                    message, guild_state, context, is_action=is_action
+                )
+            except Exception as e:
+                logger.error(
+                    "error processing message in guild %s: %s",
+                    guild_state.guild_id,
+                    e,
+                    exc_info=True,
+                )
+
+    async def _classify(self, context: GameContext, guild_state: GuildState) -> bool:
+        if context.force_feed:
+            return True
+        # Concurrency is bounded by the AI provider (`game.max_concurrent_requests`)
+        return await guild_state.game_engine.is_game_action(context.message_content)
+
+    async def make_context(self, message: discord.Message) -> GameContext | None:
         if message.author == self.bot.user or message.author.bot:
-            return
+            return None
 
         logger.debug(
             "received message from %s: %s", message.author.display_name, message.content
@@ -96,14 +135,18 @@ class MessageHandler(commands.Cog):
             context.force_feed,
         )
 
-        return await do_handle_message(message, guild_state, context)
+        return context
 
 
 async def do_handle_message(
-    message: discord.Message, guild_state: GuildState, context: GameContext
+    message: discord.Message,
+    guild_state: GuildState,
+    context: GameContext,
+    *,
+    is_action: bool | None = None,
 ):
     game_response = await guild_state.game_engine.process_message(
-        context, message.channel.typing
+        context, message.channel.typing, is_action=is_action
     )
     if not game_response:
         logger.debug("game did not produce a response")
@@ -1,14 +1,47 @@
 import asyncio
+from collections import deque
 from dataclasses import dataclass, field
+import logging
 
 import discord
 
 from fun_game.game import GameEngine
 
+logger = logging.getLogger("bot.guild_state")
+
+# The most unprocessed messages to hold per guild. Older messages are dropped first.
+_MAX_QUEUED_MESSAGES = 1024
+
 
 @dataclass
 class GuildState:
     guild_id: int
     game_engine: GameEngine
     game_channel: discord.TextChannel | None = None
-    message_queue: asyncio.Queue[discord.Message] = field(default_factory=asyncio.Queue)
+    message_queue: deque[discord.Message] = field(
+        default_factory=lambda: deque(maxlen=_MAX_QUEUED_MESSAGES)
+    )
+    has_messages: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def put_message(self, message: discord.Message):
+        if len(self.message_queue) == self.message_queue.maxlen:
+            logger.warning(
+                "message queue for guild %s is full, dropping message %s",
+                self.guild_id,
+                self.message_queue[0].id,
+            )
+        self.message_queue.append(message)
+        self.has_messages.set()
+
+    async def get_messages(self, max_count: int) -> list[discord.Message]:
+        """
+        Waits for messages to be queued and then takes up to `max_count` of them, oldest first.
+        """
+        await self.has_messages.wait()
+        batch = [
+            self.message_queue.popleft()
+            for _ in range(min(max_count, len(self.message_queue)))
+        ]
+        if not self.message_queue:
+            self.has_messages.clear()
+        return batch
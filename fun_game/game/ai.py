@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
+import asyncio
 import logging
 import os
-from typing import Type, Union
+from typing import Type
 
+import anthropic
 from anthropic import AsyncAnthropic
 import anthropic.types
+from anthropic.types.beta.prompt_caching import (
+    PromptCachingBetaMessage,
+    PromptCachingBetaTextBlockParam,
+)
+import httpx
 from openai import AsyncOpenAI
 import openai.types.chat
 from pydantic import BaseModel
@@ -15,12 +22,22 @@ logger.setLevel(logging.DEBUG)
 
 class AIProvider(ABC):
     @classmethod
-    def default(cls):
+    def default(cls, max_concurrent_requests: int = 16):
+        # Both SDKs are built on httpx, so let them share one connection pool
+        http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
         return DefaultAIProvider(
-            AsyncAnthropic(api_key=os.environ["ANTHROPIC_API_KEY"]),
-            AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"]),
+            AsyncAnthropic(
+                api_key=os.environ["ANTHROPIC_API_KEY"], http_client=http_client
+            ),
+            AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"], http_client=http_client),
+            max_concurrent_requests=max_concurrent_requests,
         )
 
+    async def close(self):
+        pass
+
     @abstractmethod
     async def prompt_mini[
         T: BaseModel
@@ -28,50 +45,86 @@ class AIProvider(ABC):
         pass
 
     @abstractmethod
-    async def prompt[T: BaseModel](self, user: str, system: str, model: Type[T]) -> T:
-        pass
+    async def prompt[
+        T: BaseModel
+    ](self, user: str, system: str | list[str], model: Type[T]) -> T:
+        """
+        `system` may be a list of blocks ordered from most to least stable,
+        in which case the first block is marked as a cacheable prefix.
+        """
 
 
 class DefaultAIProvider(AIProvider):
-    def __init__(self, anthropic_client: AsyncAnthropic, openai_client: AsyncOpenAI):
+    def __init__(
+        self,
+        anthropic_client: AsyncAnthropic,
+        openai_client: AsyncOpenAI,
+        max_concurrent_requests: int = 16,
+    ):
         self.anthropic = anthropic_client
         self.openai = openai_client
+        # Bursts beyond the rate limit only turn into 429s and SDK retry backoff,
+        # so excess requests wait here instead. Each provider is limited separately.
+        self._anthropic_semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._openai_semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+    async def close(self):
+        await self.anthropic.close()
+        await self.openai.close()
 
     async def prompt_mini[
         T: BaseModel
     ](self, user: str, system: str, model: Type[T], temperature: int | None = 0) -> T:
-        response = await self.openai.chat.completions.create(
-            model="gpt-4o-mini",
-            max_tokens=1024,
-            temperature=temperature,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-        )
-        return parse_ai_response(response, model)
-
-    async def prompt[T: BaseModel](self, user: str, system: str, model: Type[T]) -> T:
-        response = await self.anthropic.messages.create(
-            model="claude-3-5-sonnet-latest",
-            max_tokens=8000,
-            system=system,
-            messages=[{"role": "user", "content": user}],
-        )
-        return parse_ai_response(response, model)
-
-
-def parse_ai_response[
-    T: BaseModel
-](
-    response: Union[anthropic.types.Message, openai.types.chat.ChatCompletion],
-    struct: Type[T],
-) -> T:
-    if isinstance(response, openai.types.chat.ChatCompletion):
-        response_message = response.choices[0].message.content or ""
-    else:
-        response_content = response.content[0]
-        assert isinstance(response_content, anthropic.types.TextBlock)
-        response_message = response_content.text
-
-    return struct.model_validate_json(response_message)
+        async with self._openai_semaphore:
+            response = await self.openai.chat.completions.create(
+                model="gpt-4o-mini",
+                max_tokens=1024,
+                temperature=temperature,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user},
+                ],
+            )
+        return model.model_validate_json(_extract_openai_text(response))
+
+    async def prompt[
+        T: BaseModel
+    ](self, user: str, system: str | list[str], model: Type[T]) -> T:
+        async with self._anthropic_semaphore:
+            # Prompt caching is only exposed through the beta client in this SDK version
+            response = await self.anthropic.beta.prompt_caching.messages.create(
+                model="claude-3-5-sonnet-latest",
+                max_tokens=8000,
+                system=(
+                    system if isinstance(system, str) else _make_cached_system(system)
+                ),
+                messages=[{"role": "user", "content": user}],
+            )
+        return model.model_validate_json(_extract_anthropic_text(response))
+
+
+def _make_cached_system(
+    blocks: list[str],
+) -> list[PromptCachingBetaTextBlockParam]:
+    system: list[PromptCachingBetaTextBlockParam] = [
+        {"type": "text", "text": block} for block in blocks if block
+    ]
+    if system:
+        system[0]["cache_control"] = {"type": "ephemeral"}
+    return system
+
+
+def _extract_openai_text(response: openai.types.chat.ChatCompletion) -> str:
+    text = response.choices[0].message.content
+    if not text:
+        logger.error("empty response from OpenAI: %s", response)
+        raise ValueError("OpenAI returned an empty response")
+    return text
+
+
+def _extract_anthropic_text(response: PromptCachingBetaMessage) -> str:
+    content = response.content[0] if response.content else None
+    if not isinstance(content, anthropic.types.TextBlock) or not content.text:
+        logger.error("unexpected response from Anthropic: %s", response)
+        raise ValueError("Anthropic did not return a text response")
+    return content.text
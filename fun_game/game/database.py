@@ -1,6 +1,7 @@
+import itertools
 import sqlite3
 from contextlib import contextmanager
-from typing import Generator
+from typing import Generator, Sequence
 import time
 
 from .models import CustomRule, Message, MessageStatus, SimpleMessage, User
@@ -173,6 +174,24 @@ class DatabaseConnection:
         assert self.cursor.lastrowid
         return self.cursor.lastrowid
 
+    def add_messages(
+        self, messages: Sequence[tuple[str, int, int | None]]
+    ) -> list[int]:
+        """
+        Adds `(content, sender_id, reply_to_id)` messages in a single statement.
+        Returns the new message ids in the same order as `messages`.
+        """
+        if not messages:
+            return []
+        self.cursor.execute(
+            f"""INSERT INTO messages (content, sender_id, reply_to_id)
+               VALUES {", ".join(["(?, ?, ?)"] * len(messages))}
+               RETURNING id""",
+            [value for message in messages for value in message],
+        )
+        # Rows are inserted in order, but RETURNING does not guarantee the order it reports them in
+        return sorted(row["id"] for row in self.cursor.fetchall())
+
     def mark_message_sent(self, message_id: int, upstream_id: int):
         self.cursor.execute(
             "UPDATE messages SET upstream_id = ? WHERE id = ?",
@@ -223,32 +242,50 @@ class DatabaseConnection:
 
         # Handle world state changes
         if world_changes:
-            for item_name, should_add in world_changes.items():
-                item_id = self.get_or_create_item(item_name)
-                if should_add:
-                    self.cursor.execute(
-                        "INSERT OR IGNORE INTO world_state (item_id) VALUES (?)",
-                        (item_id,),
-                    )
-                else:
-                    self.cursor.execute(
-                        "DELETE FROM world_state WHERE item_id = ?", (item_id,)
-                    )
+            added, removed = self._partition_changes(world_changes)
+            self.cursor.executemany(
+                """
+                INSERT OR IGNORE INTO world_state (item_id)
+                SELECT id FROM items WHERE name = ?
+                """,
+                added,
+            )
+            self.cursor.executemany(
+                """
+                DELETE FROM world_state
+                WHERE item_id = (SELECT id FROM items WHERE name = ?)
+                """,
+                removed,
+            )
 
         # Handle inventory changes
         if inventory_changes:
-            for item_name, should_add in inventory_changes.items():
-                item_id = self.get_or_create_item(item_name)
-                if should_add:
-                    self.cursor.execute(
-                        "INSERT OR IGNORE INTO player_inventories (user_id, item_id) VALUES (?, ?)",
-                        (user_id, item_id),
-                    )
-                else:
-                    self.cursor.execute(
-                        "DELETE FROM player_inventories WHERE user_id = ? AND item_id = ?",
-                        (user_id, item_id),
-                    )
+            added, removed = self._partition_changes(inventory_changes)
+            self.cursor.executemany(
+                """
+                INSERT OR IGNORE INTO player_inventories (user_id, item_id)
+                SELECT ?, id FROM items WHERE name = ?
+                """,
+                [(user_id, name) for (name,) in added],
+            )
+            self.cursor.executemany(
+                """
+                DELETE FROM player_inventories
+                WHERE user_id = ? AND item_id = (SELECT id FROM items WHERE name = ?)
+                """,
+                [(user_id, name) for (name,) in removed],
+            )
+
+    def _partition_changes(
+        self, changes: dict[str, bool]
+    ) -> tuple[list[tuple[str]], list[tuple[str]]]:
+        """
+        Splits a patch set into added and removed item names, creating any added items.
+        """
+        added = [(name,) for name, should_add in changes.items() if should_add]
+        removed = [(name,) for name, should_add in changes.items() if not should_add]
+        self.cursor.executemany("INSERT OR IGNORE INTO items (name) VALUES (?)", added)
+        return added, removed
 
     def load_world_state(self) -> set[str]:
         self.cursor.execute(
@@ -273,13 +310,31 @@ class DatabaseConnection:
         return {row["name"] for row in self.cursor.fetchall()}
 
 
-# pylint: disable=too-few-public-methods
+_CONNECTION_PRAGMAS = (
+    # WAL lets readers proceed while a writer is active. It is persisted in the file after the first connection.
+    "PRAGMA journal_mode = WAL",
+    # NORMAL is durable in WAL mode except on power loss, and avoids an fsync per commit
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # 64 MiB
+    "PRAGMA mmap_size = 268435456",  # 256 MiB
+)
+
+
 class Database:
     def __init__(self, db_path: str):
         self.db_path = db_path
+        # A single long-lived connection keeps the page cache warm and avoids reopening the file
+        self._conn = sqlite3.connect(db_path)
+        self._conn.row_factory = sqlite3.Row
+        self._savepoint_ids = itertools.count()
+        for pragma in _CONNECTION_PRAGMAS:
+            self._conn.execute(pragma)
         self._init_db()
         self.version = self._get_version()
         self._migrate()
+        # Recommended by SQLite for long-lived connections; analysis is limited so this stays cheap
+        self._conn.execute("PRAGMA optimize = 0x10002")
 
     def _get_version(self) -> int:
         with self.connect() as db:
@@ -289,34 +344,62 @@ class Database:
     def _migrate(self):
         pass
 
+    @property
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction
+
+    def close(self):
+        # Lets SQLite refresh planner statistics for tables whose use has changed
+        self._conn.execute("PRAGMA optimize")
+        self._conn.close()
+
     @contextmanager
     def connect(
         self, max_retries: int = 5, retry_delay: float = 0.1
     ) -> Generator[DatabaseConnection, None, None]:
-        conn = None
+        """
+        Runs the block in a transaction that is committed on success and rolled back on error.
+        If called from inside another `connect` block, the block is nested in a savepoint instead.
+
+        All callers share one connection, so a block must never be held open across an `await`:
+        another task's commit or rollback would end it.
+        """
+        conn = self._conn
+        if conn.in_transaction:
+            with self._savepoint() as db:
+                yield db
+            return
+
         for attempt in range(max_retries):
             try:
-                conn = sqlite3.connect(self.db_path)
-                conn.row_factory = sqlite3.Row
-                db_conn = DatabaseConnection(conn)
                 conn.execute("BEGIN TRANSACTION")
-                yield db_conn
-                conn.commit()
                 break
             except sqlite3.OperationalError as e:
                 if "database is locked" in str(e) and attempt < max_retries - 1:
                     time.sleep(retry_delay)
                 else:
-                    if conn:
-                        conn.rollback()
                     raise
-            except Exception as e:
-                if conn:
-                    conn.rollback()
-                raise e
-            finally:
-                if conn:
-                    conn.close()
+        try:
+            yield DatabaseConnection(conn)
+            conn.commit()
+        except BaseException:
+            # Includes cancellation, which would otherwise leave the shared connection mid-transaction
+            conn.rollback()
+            raise
+
+    @contextmanager
+    def _savepoint(self) -> Generator[DatabaseConnection, None, None]:
+        name = f"nested_{next(self._savepoint_ids)}"
+        self._conn.execute(f"SAVEPOINT {name}")
+        succeeded = False
+        try:
+            yield DatabaseConnection(self._conn)
+            succeeded = True
+        finally:
+            # Also reached on cancellation, so the savepoint is never left open
+            if not succeeded:
+                self._conn.execute(f"ROLLBACK TO {name}")
+            self._conn.execute(f"RELEASE {name}")
 
     def _init_db(self):
         with self.connect() as db:
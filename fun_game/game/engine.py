@@ -1,9 +1,11 @@
 import logging
+import sys
 from typing import AsyncContextManager, Callable, Iterable
 
 from fun_game.config import GameConfig
 from .database import Database, DatabaseConnection
 from .ai import AIProvider
+from .filter_cache import FilterCache
 from .models import (
     CustomRule,
     GameContext,
@@ -13,22 +15,32 @@ from .models import (
     SimpleMessage,
 )
 from .prompts import (
+    Changes,
     FilterModelResponse,
     GameModelResponse,
     make_filter_system_prompt,
     make_game_system_prompt,
+    normalize_message,
+    prefilter_message,
 )
 
 logger = logging.getLogger("game.engine")
 logger.setLevel(logging.DEBUG)
 
+# The most tokens of message context to include in a game prompt
+_CONTEXT_TOKEN_BUDGET = 4000
+
 
 class GameEngine:
     @classmethod
-    def make_factory(cls, config: GameConfig) -> Callable[[str], "GameEngine"]:
+    def make_factory(
+        cls, config: GameConfig, ai: AIProvider | None = None
+    ) -> Callable[[str], "GameEngine"]:
+        # Shared by all instances so that API keys are read and clients are built once
+        ai = ai if ai else AIProvider.default(config.max_concurrent_requests)
+
         def _factory(instance_id: str) -> "GameEngine":
             db = Database(f"data/{instance_id}.sqlite")
-            ai = AIProvider.default()
             return cls(config, instance_id, ai=ai, db=db)
 
         return _factory
@@ -46,11 +58,27 @@ class GameEngine:
         self._db = db if db else Database(f"data/{instance_id}.sqlite")
         self._world_state: set[str] = set()
         self._custom_rules: dict[int, CustomRule] = {}
+        self._custom_rule_texts: tuple[str, ...] = ()
         self._player_inventories: dict[int, set[str]] = {}
+        self._user_ids: dict[int, int] = {}  # upstream id -> user id
+        self._filter_cache = FilterCache()
+        self._known_filter_messages = {
+            normalize_message(example): forward
+            for forward, examples in (
+                (True, config.filter.examples.accept),
+                (False, config.filter.examples.reject),
+            )
+            for example in examples
+        }
+        self._filter_system_prompt = make_filter_system_prompt(
+            positive_examples=config.filter.examples.accept,
+            negative_examples=config.filter.examples.reject,
+        )
 
         with self._db.connect() as dbc:
-            self._world_state = dbc.load_world_state()
+            self._world_state = _intern_items(dbc.load_world_state())
             self._custom_rules = {rule.id: rule for rule in dbc.load_custom_rules()}
+        self._refresh_custom_rule_texts()
 
     @property
     def world_state(self) -> Iterable[str]:
@@ -64,10 +92,17 @@ class GameEngine:
         self,
         context: GameContext,
         contextmanager: Callable[[], AsyncContextManager] | None = None,
+        *,
+        is_action: bool | None = None,
     ) -> GameResponse | None:
+        """
+        `is_action` may be passed if the message has already been classified by `is_game_action`.
+        """
         # Check if message is for the game
         if not context.force_feed:
-            if not await self.is_game_action(context.message_content):
+            if is_action is None:
+                is_action = await self.is_game_action(context.message_content)
+            if not is_action:
                 logger.debug("message has been filtered")
                 return None
 
@@ -78,9 +113,12 @@ class GameEngine:
             return await self._do_process_message(context)
 
     async def _do_process_message(self, context: GameContext) -> GameResponse | None:
+        # The database is shared with other tasks, so no transaction is held across the model call
         with self._db.connect() as db:
             message_data = self._prepare_message_data(db, context)
-            game_response = await self._generate_game_response(context, message_data)
+        self._remember_user_id(context.user_id, message_data.user.id)
+        game_response = await self._generate_game_response(context, message_data)
+        with self._db.connect() as db:
             reply_id = self._persist_response(db, context, message_data, game_response)
 
         self._update_cached_state(game_response, message_data.user.id)
@@ -100,7 +138,9 @@ class GameEngine:
         )
 
         message_id = self._ensure_message_exists(db, context, user.id, reply_to_message)
-        message_context = db.get_message_context(message_id)
+        message_context = _trim_to_budget(
+            db.get_message_context(message_id), _CONTEXT_TOKEN_BUDGET
+        )
         player_inventory = self._load_player_inventory(user.id, db)
 
         return MessageData(user, message, message_id, message_context, player_inventory)
@@ -166,14 +206,17 @@ class GameEngine:
         return filter_response.forward
 
     async def _filter_message(self, message: str) -> FilterModelResponse:
-        examples = self._config.filter.examples
-        return await self._ai.prompt_mini(
-            message,
-            make_filter_system_prompt(
-                positive_examples=examples.accept, negative_examples=examples.reject
-            ),
-            FilterModelResponse,
+        prefiltered_response = prefilter_message(message, self._known_filter_messages)
+        if prefiltered_response:
+            return prefiltered_response
+        cached_response = self._filter_cache.get(message)
+        if cached_response:
+            return cached_response
+        filter_response = await self._ai.prompt_mini(
+            message, self._filter_system_prompt, FilterModelResponse
         )
+        self._filter_cache.put(message, filter_response)
+        return filter_response
 
     async def _process_game_action(
         self,
@@ -190,18 +233,18 @@ class GameEngine:
             player_name=player_name,
             player_inventory=player_inventory,
             context=message_context,
-            custom_rules=(rule.rule for rule in self._custom_rules.values()),
+            custom_rules=self._custom_rule_texts,
             sudo=sudo,
         )
         return await self._ai.prompt(message, system_prompt, GameModelResponse)
 
     def add_custom_rule(self, rule: str, creator_id: int, secret: bool) -> int | None:
         with self._db.connect() as db:
-            user = db.get_or_create_user(creator_id, "<unknown>")
-            if not user:
-                return None
-            custom_rule = db.add_custom_rule(rule, user.id, secret)
+            user_id = self._get_user_id(db, creator_id, "<unknown>")
+            custom_rule = db.add_custom_rule(rule, user_id, secret)
+        self._remember_user_id(creator_id, user_id)
         self._custom_rules[custom_rule.id] = custom_rule
+        self._refresh_custom_rule_texts()
         return custom_rule.id
 
     def remove_custom_rules(self, rule_ids: Iterable[int]):
@@ -209,6 +252,12 @@ class GameEngine:
             for rule_id in rule_ids:
                 db.remove_custom_rule(rule_id)
                 del self._custom_rules[rule_id]
+        self._refresh_custom_rule_texts()
+
+    def _refresh_custom_rule_texts(self):
+        self._custom_rule_texts = tuple(
+            rule.rule for rule in self._custom_rules.values()
+        )
 
     def record_response_reaction(
         self,
@@ -219,11 +268,12 @@ class GameEngine:
     ):
         with self._db.connect() as db:
             message = db.get_message(upstream_message_id)
-            user = db.get_or_create_user(upstream_user_id, user_name)
-            if not message or not user:
+            if not message:
                 return
+            user_id = self._get_user_id(db, upstream_user_id, user_name)
             logger.info("%s added reaction %s to message", user_name, reaction)
-            db.add_reaction(message.id, user.id, reaction)
+            db.add_reaction(message.id, user_id, reaction)
+        self._remember_user_id(upstream_user_id, user_id)
 
     def unrecord_response_reaction(
         self,
@@ -234,45 +284,82 @@ class GameEngine:
     ):
         with self._db.connect() as db:
             message = db.get_message(upstream_message_id)
-            user = db.get_or_create_user(upstream_user_id, user_name)
-            if not message or not user:
+            if not message:
                 return
+            user_id = self._get_user_id(db, upstream_user_id, user_name)
             logger.info("%s removed reaction %s from message", user_name, reaction)
-            db.remove_reaction(message.id, user.id, reaction)
+            db.remove_reaction(message.id, user_id, reaction)
+        self._remember_user_id(upstream_user_id, user_id)
 
     def player_inventory(self, user_id: int) -> Iterable[str]:
         with self._db.connect() as db:
-            user = db.get_or_create_user(user_id, "<unknown>")
-            if not user:
-                return []
-            return self._load_player_inventory(user.id, db)
+            internal_user_id = self._get_user_id(db, user_id, "<unknown>")
+            inventory = self._load_player_inventory(internal_user_id, db)
+        self._remember_user_id(user_id, internal_user_id)
+        return inventory
+
+    def _get_user_id(
+        self, db: DatabaseConnection, upstream_user_id: int, user_name: str
+    ) -> int:
+        user_id = self._user_ids.get(upstream_user_id)
+        if user_id is None:
+            user_id = db.get_or_create_user(upstream_user_id, user_name).id
+        return user_id
+
+    def _remember_user_id(self, upstream_user_id: int, user_id: int):
+        # Only committed ids are cached: a rolled back user's id is handed out again
+        if not self._db.in_transaction:
+            self._user_ids[upstream_user_id] = user_id
 
     def _load_player_inventory(
         self, user_id: int, db: DatabaseConnection
     ) -> Iterable[str]:
         player_inventory = self._player_inventories.get(user_id)
         if player_inventory is None:
-            self._player_inventories[user_id] = db.load_player_inventory(user_id)
+            self._player_inventories[user_id] = _intern_items(
+                db.load_player_inventory(user_id)
+            )
         return self._player_inventories[user_id]
 
     def _update_cached_state(self, game_response, user_id):
         # Update world state
         if game_response.world_state_updates:
-            for item, should_add in game_response.world_state_updates.items():
-                if should_add:
-                    self._world_state.add(item)
-                else:
-                    self._world_state.discard(item)
+            _apply_changes(self._world_state, game_response.world_state_updates)
 
         # Update player inventory
         if game_response.player_inventory_updates:
-            for item, should_add in game_response.player_inventory_updates.items():
-                if should_add:
-                    self._player_inventories[user_id].add(item)
-                else:
-                    self._player_inventories[user_id].discard(item)
+            _apply_changes(
+                self._player_inventories[user_id],
+                game_response.player_inventory_updates,
+            )
+
+    def close(self):
+        self._db.close()
 
     def mark_message_processed(self, message_id: int, upstream_message_id: int):
         with self._db.connect() as db:
             db.mark_message_sent(message_id=message_id, upstream_id=upstream_message_id)
         logger.debug("marked message as processed")
+
+
+def _apply_changes(items: set[str], changes: Changes):
+    # Partitioned once so that the set updates run as two bulk operations
+    items -= {item for item, should_add in changes.items() if not should_add}
+    items |= _intern_items(item for item, should_add in changes.items() if should_add)
+
+
+def _intern_items(items: Iterable[str]) -> set[str]:
+    # Items often appear in both the world and several inventories, so share one copy of each
+    return {sys.intern(item) for item in items}
+
+
+def _trim_to_budget(context: list[SimpleMessage], budget: int) -> list[SimpleMessage]:
+    """
+    Returns the newest messages of the context that fit within `budget` tokens, in their original order.
+    """
+    used = 0
+    start = len(context)
+    while start > 0 and used + context[start - 1].token_estimate <= budget:
+        start -= 1
+        used += context[start].token_estimate
+    return context[start:]
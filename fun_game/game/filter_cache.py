@@ -0,0 +1,47 @@
+from collections import OrderedDict
+import time
+
+from .prompts import FilterModelResponse, normalize_message
+
+
+class FilterCache:
+    """
+    An LRU cache of filter decisions keyed by normalized message text.
+    Chat channels repeat themselves a lot, so this skips the filter model for repeated messages.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4096,
+        ttl: float = 3600,
+        min_confidence: float = 0.8,
+    ):
+        self._entries: OrderedDict[str, tuple[float, FilterModelResponse]] = (
+            OrderedDict()
+        )
+        self._max_size = max_size
+        self._ttl = ttl
+        self._min_confidence = min_confidence
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, message: str) -> FilterModelResponse | None:
+        key = normalize_message(message)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def put(self, message: str, response: FilterModelResponse):
+        # Don't let uncertain decisions be repeated for every copy of a message
+        if response.confidence < self._min_confidence:
+            return
+        key = normalize_message(message)
+        self._entries[key] = (time.monotonic() + self._ttl, response)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
@@ -1,17 +1,33 @@
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Iterable
 
 if TYPE_CHECKING:
     from .engine import GameEngine
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SimpleMessage:
     id: int
     sender: str
     sender_id: int
     content: str
+    # How the message's sender is shown in prompts
+    display_prefix: str = field(init=False, repr=False, compare=False)
+    # A rough count of the tokens the message occupies in a prompt (~4 characters per token)
+    token_estimate: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "display_prefix",
+            "You" if self.sender_id == 0 else f"Player {self.sender}",
+        )
+        object.__setattr__(
+            self,
+            "token_estimate",
+            (len(self.display_prefix) + len(self.content)) // 4 + 1,
+        )
 
 
 class MessageStatus(Enum):
@@ -21,7 +37,7 @@ class MessageStatus(Enum):
     SUDO = "sudo"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Message:
     id: int
     upstream_id: int | None
@@ -32,14 +48,14 @@ class Message:
     status: MessageStatus
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class User:
     id: int
     upstream_id: int
     name: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MessageData:
     user: User
     message: Message | None
@@ -48,7 +64,7 @@ class MessageData:
     player_inventory: Iterable[str]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GameContext:
     user_id: int
     user_name: str
@@ -59,7 +75,7 @@ class GameContext:
     force_feed: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class GameResponse:
     response_text: str
 
@@ -70,7 +86,7 @@ class GameResponse:
         self._engine.mark_message_processed(self._message_id, upstream_reply_id)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CustomRule:
     id: int
     rule: str
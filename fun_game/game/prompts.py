@@ -1,5 +1,7 @@
-from textwrap import dedent
-from typing import Iterable
+from functools import lru_cache
+import re
+from types import MappingProxyType
+from typing import Iterable, Mapping
 
 from pydantic import BaseModel
 
@@ -58,6 +60,30 @@ class FilterModelResponse(BaseModel):
     confidence: float
 
 
+# Slash commands and blank messages are never meant for the simulator
+_PREFILTER_REJECT_RE = re.compile(r"^(?:/|\s*$)")
+
+
+def normalize_message(message: str) -> str:
+    # Also collapses runs of whitespace, which differ a lot between copies of a message
+    return " ".join(message.lower().split())
+
+
+def prefilter_message(
+    message: str, known_messages: Mapping[str, bool]
+) -> FilterModelResponse | None:
+    """
+    Classifies messages that obviously should or should not be forwarded without consulting a model.
+    `known_messages` maps normalized messages to whether they should be forwarded.
+    """
+    if _PREFILTER_REJECT_RE.match(message):
+        return FilterModelResponse(forward=False, confidence=1.0)
+    forward = known_messages.get(normalize_message(message))
+    if forward is None:
+        return None
+    return FilterModelResponse(forward=forward, confidence=1.0)
+
+
 # pylint: disable=line-too-long
 _GAME_SYSTEM_PROMPT = """You are a multiplayer simulation game engine that processes commands to advance game state in a manner consistent with the world properties, core mechanics, and interaction rules.
 
@@ -105,6 +131,23 @@ type ModelResponse = {{
 """
 
 
+_SUDO_BANNER = """You are currently processing messages from the game designer.
+The game designer is allowed to request arbitary changes to the world.
+Accommodate the requests in the most seamless way possible given the existing world state."""
+
+_PLAYER_BANNER_TEMPLATE = (
+    "You are currently processing messages from the player named {player_name}."
+)
+
+_WORLD_STATE_HEADER = "The world has the following state:"
+
+_INVENTORY_HEADER = "The player's inventory contains the following and nothing else:"
+
+_CONTEXT_HEADER = "Here is a selection messages sent by yourself and players, which you may find helpful:"
+
+_SECTION_SEPARATOR = "\n\n---\n\n"
+
+
 def make_game_system_prompt(
     config: EngineConfig,
     world_state: Iterable[str],
@@ -113,72 +156,81 @@ def make_game_system_prompt(
     context: Iterable[SimpleMessage],
     custom_rules: Iterable[str] | None = None,
     sudo: bool = False,
-) -> str:
-    components = [
-        _GAME_SYSTEM_PROMPT.format(
-            world_properties=_format_list(config.world_properties),
-            core_mechanics=_format_list(config.core_mechanics),
-            interaction_dos=_format_list(config.interaction_rules.do),
-            interaction_donts=_format_list(
-                f"DO NOT {s[0].lower()}{s[1:]}" for s in config.interaction_rules.dont
-            ),
-            custom_rules=(_format_list(custom_rules) if custom_rules else None)
-            or "None yet.",
-            response_guidelines=_format_list(config.response_guidelines),
-        )
+) -> list[str]:
+    """
+    Returns the system prompt as blocks ordered from most to least stable.
+    The first block depends only on the config and custom rules, so providers can cache it as a prefix.
+    """
+    static_body = _render_static_body(config, tuple(custom_rules or ()))
+
+    # Built with a single list of parts and one join to avoid intermediate strings.
+    # The separator after the static body starts the tail so that the cached block stays unchanged.
+    out = [
+        _SECTION_SEPARATOR,
+        (
+            _SUDO_BANNER
+            if sudo
+            else _PLAYER_BANNER_TEMPLATE.format(player_name=player_name)
+        ),
+        _SECTION_SEPARATOR,
     ]
 
-    components.append(
-        dedent(
-            f"""
-            Here is a selection messages sent by yourself and players, which you may find helpful:
+    if world_state:
+        out.append(_WORLD_STATE_HEADER)
+        _append_list(out, world_state)
+    else:
+        out.append("The world is empty.")
 
-            {"\n\n".join(f"{"You" if message.sender_id == 0 else "Player " + message.sender}: {message.content}" for message in context)}
-            """
-        )
-        if context
-        else ""
+    if not sudo:
+        out.append(_SECTION_SEPARATOR)
+        if player_inventory:
+            out.append(_INVENTORY_HEADER)
+            _append_list(out, player_inventory)
+        else:
+            out.append("The player's inventory is empty.")
+
+    if context:
+        out.append(_SECTION_SEPARATOR)
+        out.append(_CONTEXT_HEADER)
+        for message in context:
+            out.append("\n\n")
+            out.append(message.display_prefix)
+            out.append(": ")
+            out.append(message.content)
+
+    return [static_body, "".join(out)]
+
+
+@lru_cache(maxsize=32)
+def _render_static_body(config: EngineConfig, custom_rules: tuple[str, ...]) -> str:
+    return _GAME_SYSTEM_PROMPT.format(
+        **_format_config_sections(config),
+        custom_rules=_format_list(custom_rules) if custom_rules else "None yet.",
     )
 
-    components.append(
-        dedent(
-            f"""
-            The world has the following state:
-            {_format_list(world_state)}
-            """
-        )
-        if world_state
-        else "The world is empty."
+
+@lru_cache(maxsize=8)
+def _format_config_sections(config: EngineConfig) -> Mapping[str, str]:
+    # Kept separate from `_render_static_body` so that adding a custom rule
+    # doesn't re-format the config, which never changes at runtime.
+    return MappingProxyType(
+        {
+            "world_properties": _format_list(config.world_properties),
+            "core_mechanics": _format_list(config.core_mechanics),
+            "interaction_dos": _format_list(config.interaction_rules.do),
+            "interaction_donts": _format_list(
+                f"DO NOT {s[0].lower()}{s[1:]}" for s in config.interaction_rules.dont
+            ),
+            "response_guidelines": _format_list(config.response_guidelines),
+        }
     )
 
-    if not sudo:
-        components.append(
-            dedent(
-                f"""
-                The player's inventory contains the following and nothing else:
-                {_format_list(player_inventory)}
-                """
-            )
-            if player_inventory
-            else "The player's inventory is empty."
-        )
-
-    if sudo:
-        components.append(
-            dedent(
-                """
-                You are currently processing messages from the game designer.
-                The game designer is allowed to request arbitary changes to the world.
-                Accommodate the requests in the most seamless way possible given the existing world state.
-                """
-            )
-        )
-    else:
-        components.append(
-            f"You are currently processing messages from the player named {player_name}."
-        )
 
-    return "\n\n---\n\n".join(components)
+def _append_list(out: list[str], items: Iterable[str], prefix: str = "- "):
+    for item in items:
+        out.append("\n")
+        out.append(prefix)
+        out.append(item)
 
 
 def _format_list(items: Iterable[str], prefix: str | None = "- ") -> str:
@@ -4,11 +4,10 @@ import asyncio
 import logging
 
 from dotenv import load_dotenv
-import discord
 
 from fun_game.config import Config
-from fun_game.frontends import Discord
 from fun_game.game import GameEngine
+from fun_game.game.ai import AIProvider
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -22,19 +21,38 @@ async def main():
 
     config = Config.load(args.config)
 
-    if config.frontend.discord:
-        async with Discord(
-            config.frontend.discord, engine_factory=GameEngine.make_factory(config.game)
-        ) as bot:
-            try:
-                await bot.start(os.environ["DISCORD_TOKEN"])
-            except discord.LoginFailure:
-                logger.error("Invalid token")
-            except Exception as e:
-                logger.error("Error running bot: %s", e)
-    else:
-        raise TypeError("no frontend specified")
+    ai = AIProvider.default(config.game.max_concurrent_requests)
+    try:
+        if config.frontend.discord:
+            # Frontends are imported only once selected so that unused SDKs are never loaded
+            # pylint: disable=import-outside-toplevel
+            import discord
+            from fun_game.frontends import Discord
+
+            async with Discord(
+                config.frontend.discord,
+                engine_factory=GameEngine.make_factory(config.game, ai=ai),
+            ) as bot:
+                try:
+                    await bot.start(os.environ["DISCORD_TOKEN"])
+                except discord.LoginFailure:
+                    logger.error("Invalid token")
+                except Exception as e:
+                    logger.error("Error running bot: %s", e)
+        else:
+            raise TypeError("no frontend specified")
+    finally:
+        await ai.close()
+
+
+def _loop_factory():
+    # uvloop is optional, but lowers per-callback overhead when it is installed
+    try:
+        import uvloop  # type: ignore[import-not-found]  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(), loop_factory=_loop_factory())
@@ -0,0 +1,109 @@
+# pylint: disable=redefined-outer-name,super-init-not-called
+
+from contextlib import contextmanager
+from typing import Generator
+
+import pytest
+
+from fun_game.game.database import Database, DatabaseConnection
+from fun_game.game.models import CustomRule, Message, SimpleMessage, User
+
+
+class FakeDatabaseConnection(DatabaseConnection):
+    """
+    An in-memory stand-in for a database connection with just enough behavior for engine tests.
+    """
+
+    def __init__(self):
+        self.world_state = {"room", "sword"}
+        self.user = User(id=1, upstream_id=1, name="test_user")
+        self.messages: dict[int, Message] = {}
+        self.reactions: set[tuple[int, int, str]] = set()
+        self.user_lookups = 0
+
+    def load_world_state(self) -> set[str]:
+        return set(self.world_state)
+
+    def load_custom_rules(self) -> list[CustomRule]:
+        return []
+
+    def get_or_create_user(self, upstream_id: int, display_name: str) -> User:
+        self.user_lookups += 1
+        return self.user
+
+    def get_message(self, upstream_id: int) -> Message | None:
+        return self.messages.get(upstream_id)
+
+    def add_message(
+        self,
+        content: str,
+        sender_id: int,
+        upstream_id: int | None = None,
+        reply_to_id: int | None = None,
+        filtered: bool | None = False,
+    ) -> int:
+        return 1
+
+    def get_message_context(
+        self, base_message: int, size: int = 10
+    ) -> list[SimpleMessage]:
+        return []
+
+    def load_player_inventory(self, user_id: int) -> set[str]:
+        return set()
+
+    def update_game_state(
+        self,
+        user_id: int,
+        world_changes: dict[str, bool] | None,
+        inventory_changes: dict[str, bool] | None,
+        trigger_message_id: int | None,
+    ):
+        pass
+
+    def unfilter_message(self, message_id: int):
+        pass
+
+    def mark_message_sent(self, message_id: int, upstream_id: int):
+        pass
+
+    def add_reaction(self, message_id: int, user_id: int | None, reaction: str):
+        assert user_id is not None
+        self.reactions.add((message_id, user_id, reaction))
+
+    def remove_reaction(self, message_id: int, user_id: int, reaction: str):
+        self.reactions.discard((message_id, user_id, reaction))
+
+
+class FakeDatabase(Database):
+    def __init__(self, connection: FakeDatabaseConnection):
+        self.connection = connection
+
+    @property
+    def in_transaction(self) -> bool:
+        return False
+
+    @contextmanager
+    def connect(
+        self, max_retries: int = 5, retry_delay: float = 0.1
+    ) -> Generator[DatabaseConnection, None, None]:
+        yield self.connection
+
+
+@pytest.fixture
+def fake_db_connection() -> FakeDatabaseConnection:
+    return FakeDatabaseConnection()
+
+
+@pytest.fixture
+def fake_db(fake_db_connection: FakeDatabaseConnection) -> FakeDatabase:
+    return FakeDatabase(fake_db_connection)
+
+
+@pytest.fixture
+def file_db(tmp_path) -> Generator[Database, None, None]:
+    # Unlike a shared in-memory database, this goes through top-level transactions
+    # and the on-disk pragmas
+    database = Database(str(tmp_path / "game.sqlite"))
+    yield database
+    database.close()
@@ -0,0 +1,109 @@
+# pylint: disable=protected-access
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from anthropic.types import TextBlock, ToolUseBlock
+from anthropic.types.beta.prompt_caching import PromptCachingBetaMessage
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+import pytest
+
+from fun_game.game import ai
+from fun_game.game.ai import DefaultAIProvider
+from fun_game.game.prompts import FilterModelResponse
+
+
+def make_chat_completion(content: str | None) -> ChatCompletion:
+    return ChatCompletion(
+        id="completion",
+        created=0,
+        model="gpt-4o-mini",
+        object="chat.completion",
+        choices=[
+            Choice(
+                index=0,
+                finish_reason="stop",
+                message=ChatCompletionMessage(role="assistant", content=content),
+            )
+        ],
+    )
+
+
+def make_anthropic_message(content: list) -> PromptCachingBetaMessage:
+    return PromptCachingBetaMessage.model_construct(content=content)
+
+
+def test_extract_openai_text():
+    assert ai._extract_openai_text(make_chat_completion("{}")) == "{}"
+
+    with pytest.raises(ValueError):
+        ai._extract_openai_text(make_chat_completion(None))
+    with pytest.raises(ValueError):
+        ai._extract_openai_text(make_chat_completion(""))
+
+
+def test_extract_anthropic_text():
+    text = TextBlock(type="text", text="{}")
+    assert ai._extract_anthropic_text(make_anthropic_message([text])) == "{}"
+
+    tool_use = ToolUseBlock(type="tool_use", id="tool", name="roll", input={})
+    for content in ([], [tool_use], [TextBlock(type="text", text="")]):
+        with pytest.raises(ValueError):
+            ai._extract_anthropic_text(make_anthropic_message(content))
+
+
+def test_make_cached_system_marks_first_block():
+    system = ai._make_cached_system(["static", "", "volatile"])
+
+    assert [block["text"] for block in system] == ["static", "volatile"]
+    assert system[0].get("cache_control") == {"type": "ephemeral"}
+    assert "cache_control" not in system[1]
+    assert not ai._make_cached_system([])
+
+
+@pytest.mark.asyncio
+async def test_prompt_sends_cached_system_blocks():
+    anthropic_client = Mock()
+    create = anthropic_client.beta.prompt_caching.messages.create = AsyncMock(
+        return_value=make_anthropic_message(
+            [TextBlock(type="text", text='{"forward": true, "confidence": 1.0}')]
+        )
+    )
+    provider = DefaultAIProvider(anthropic_client, Mock())
+
+    response = await provider.prompt(
+        "hello", ["static", "volatile"], FilterModelResponse
+    )
+
+    assert response == FilterModelResponse(forward=True, confidence=1.0)
+    system = create.await_args.kwargs["system"]
+    assert system[0]["cache_control"] == {"type": "ephemeral"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_bounded():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def create(**_kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return make_chat_completion('{"forward": false, "confidence": 0.9}')
+
+    openai_client = Mock()
+    openai_client.chat.completions.create = AsyncMock(side_effect=create)
+    provider = DefaultAIProvider(Mock(), openai_client, max_concurrent_requests=2)
+
+    responses = await asyncio.gather(
+        *(
+            provider.prompt_mini("hello", "system", FilterModelResponse)
+            for _ in range(5)
+        )
+    )
+
+    assert len(responses) == 5
+    assert max_in_flight == 2
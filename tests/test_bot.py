@@ -0,0 +1,59 @@
+# pylint: disable=redefined-outer-name
+
+from unittest.mock import AsyncMock, Mock
+
+import discord
+import pytest
+
+from fun_game.config import DiscordFrontendConfig
+from fun_game.frontends.discord.bot import Bot
+from fun_game.game import GameEngine
+
+
+def make_guild(channel: Mock | None) -> Mock:
+    guild = Mock()
+    guild.id = 1
+    guild.name = "guild"
+    guild.channels = [channel] if channel else []
+    guild.create_text_channel = AsyncMock(
+        side_effect=discord.Forbidden(Mock(status=403), "forbidden")
+    )
+    return guild
+
+
+def make_channel() -> Mock:
+    channel = Mock(spec=discord.TextChannel)
+    channel.name = "fun_game"
+    return channel
+
+
+@pytest.fixture
+def engine_factory():
+    return Mock(side_effect=lambda _instance_id: Mock(spec=GameEngine))
+
+
+@pytest.fixture
+def bot(engine_factory, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return Bot(DiscordFrontendConfig(channel_name="fun_game"), engine_factory)
+
+
+@pytest.mark.asyncio
+async def test_no_engine_without_channel(bot, engine_factory):
+    await bot.on_guild_join(make_guild(None))
+
+    engine_factory.assert_not_called()
+    assert not bot.guild_states
+
+
+@pytest.mark.asyncio
+async def test_rejoin_closes_replaced_engine(bot):
+    guild = make_guild(make_channel())
+
+    await bot.on_guild_join(guild)
+    first = bot.guild_states[guild.id].game_engine
+    await bot.on_guild_join(guild)
+
+    first.close.assert_called_once()
+    assert bot.guild_states[guild.id].game_engine is not first
+    bot.guild_states[guild.id].game_engine.close.assert_not_called()
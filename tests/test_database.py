@@ -1,7 +1,7 @@
-# pylint: disable=redefined-outer-name
+# pylint: disable=redefined-outer-name,protected-access
 
-import tempfile
-import os
+import asyncio
+import sqlite3
 
 import pytest
 
@@ -9,18 +9,25 @@ from fun_game.game.database import Database
 from fun_game.game.models import MessageStatus
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def db_path():
-    # Create temporary database file
-    fd, path = tempfile.mkstemp()
-    os.close(fd)
-    yield path
-    os.unlink(path)
+    return ":memory:"
+
+
+@pytest.fixture(scope="session")
+def session_db(db_path):
+    database = Database(db_path)
+    yield database
+    database.close()
 
 
 @pytest.fixture
-def db(db_path):
-    return Database(db_path)
+def db(session_db: Database):
+    # Each test runs inside a savepoint that is rolled back, so the schema is only created once
+    session_db._conn.execute("SAVEPOINT test")
+    yield session_db
+    session_db._conn.execute("ROLLBACK TO test")
+    session_db._conn.execute("RELEASE test")
 
 
 def test_get_or_create_user(db: Database):
@@ -69,12 +76,20 @@ def test_get_message_context(db: Database):
         user_d = conn.get_or_create_user(4, "UserD")
 
         # Create the conversation thread
-        _msg1_id = conn.add_message("hello A", user_a.id)
-        msg2_id = conn.add_message("hello B", user_b.id)
-        _msg3_id = conn.add_message("what's good?", user_b.id)
-        _msg4_id = conn.add_message("today is a good day", user_b.id)
-        msg5_id = conn.add_message("hey!", user_c.id, reply_to_id=msg2_id)
-        _msg6_id = conn.add_message("irrelevant context", user_d.id)
+        _msg1_id, msg2_id, _msg3_id, _msg4_id = conn.add_messages(
+            [
+                ("hello A", user_a.id, None),
+                ("hello B", user_b.id, None),
+                ("what's good?", user_b.id, None),
+                ("today is a good day", user_b.id, None),
+            ]
+        )
+        msg5_id, _msg6_id = conn.add_messages(
+            [
+                ("hey!", user_c.id, msg2_id),
+                ("irrelevant context", user_d.id, None),
+            ]
+        )
 
         # Test context retrieval with reply_to specified and size=1
         messages = conn.get_message_context(msg5_id, size=1)
@@ -211,7 +226,73 @@ def test_game_state(db: Database):
         assert "item3" not in inventory
 
 
-def test_database_general_exception(db: Database):
+def test_database_general_exception(file_db: Database):
     with pytest.raises(Exception):
-        with db.connect():
+        with file_db.connect():
             raise RuntimeError("Test exception")
+
+
+def test_nested_connect_uses_savepoint(file_db: Database):
+    with file_db.connect() as outer:
+        outer.get_or_create_user(1, "outer_user")
+
+        with file_db.connect() as inner:
+            inner.get_or_create_user(2, "inner_user")
+
+        with pytest.raises(RuntimeError):
+            with file_db.connect() as failing:
+                failing.get_or_create_user(3, "failing_user")
+                raise RuntimeError("Test exception")
+
+    assert not file_db.in_transaction
+    with file_db.connect() as conn:
+        assert conn.get_user(1) is not None
+        assert conn.get_user(2) is not None
+        assert conn.get_user(3) is None
+
+
+def test_file_database_commits_and_rolls_back(file_db: Database):
+    with file_db.connect() as conn:
+        conn.cursor.execute("PRAGMA journal_mode")
+        assert conn.cursor.fetchone()[0] == "wal"
+        conn.get_or_create_user(1, "committed_user")
+
+    with pytest.raises(RuntimeError):
+        with file_db.connect() as conn:
+            conn.get_or_create_user(2, "rolled_back_user")
+            raise RuntimeError("Test exception")
+
+    assert not file_db.in_transaction
+    # Another connection only sees what was committed
+    other = sqlite3.connect(file_db.db_path)
+    try:
+        rows = other.execute(
+            "SELECT username FROM users WHERE upstream_id IN (1, 2)"
+        ).fetchall()
+    finally:
+        other.close()
+    assert rows == [("committed_user",)]
+
+
+def test_cancelled_block_is_rolled_back(file_db: Database):
+    with pytest.raises(asyncio.CancelledError):
+        with file_db.connect() as conn:
+            conn.get_or_create_user(1, "cancelled_user")
+            raise asyncio.CancelledError()
+
+    assert not file_db.in_transaction
+    with file_db.connect() as conn:
+        conn.get_or_create_user(2, "later_user")
+        with pytest.raises(asyncio.CancelledError):
+            with file_db.connect() as nested:
+                nested.get_or_create_user(3, "cancelled_nested_user")
+                raise asyncio.CancelledError()
+
+    other = sqlite3.connect(file_db.db_path)
+    try:
+        rows = other.execute(
+            "SELECT username FROM users WHERE upstream_id IN (1, 2, 3)"
+        ).fetchall()
+    finally:
+        other.close()
+    assert rows == [("later_user",)]
@@ -1,6 +1,7 @@
 # pylint: disable=redefined-outer-name,protected-access
 
-from unittest.mock import AsyncMock, Mock, MagicMock
+import asyncio
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 
@@ -11,12 +12,21 @@ from fun_game.config import (
     FilterExamples,
     InteractionRulesConfig,
 )
-from fun_game.game.engine import GameEngine
-from fun_game.game.models import GameContext, User
-from fun_game.game.prompts import GameModelResponse
+from fun_game.game.ai import AIProvider
+from fun_game.game.engine import GameEngine, _trim_to_budget
+from fun_game.game.models import (
+    GameContext,
+    Message,
+    MessageStatus,
+    SimpleMessage,
+)
+from fun_game.game.prompts import FilterModelResponse, GameModelResponse
 
+_ACCEPT = FilterModelResponse(forward=True, confidence=0.8)
+_REJECT = FilterModelResponse(forward=False, confidence=0.8)
 
-@pytest.fixture
+
+@pytest.fixture(scope="module")
 def mock_config():
     return GameConfig(
         filter=FilterConfig(
@@ -37,45 +47,32 @@ def mock_config():
 
 
 @pytest.fixture
-def mock_db_connection():
-    connection = MagicMock()
-    connection.load_world_state.return_value = set(["room", "sword"])
-    connection.load_custom_rules.return_value = []
-    connection.get_or_create_user.return_value = User(
-        id=1, upstream_id=1, name="test_user"
-    )
-    connection.get_message.return_value = None
-    connection.add_message.return_value = 1
-    connection.get_message_context.return_value = []
-    connection.load_player_inventory.return_value = set()
-    return connection
-
-
-@pytest.fixture
-def mock_db(mock_db_connection):
-    db = MagicMock()
-    db.connect.return_value.__enter__.return_value = mock_db_connection
-    return db
+def mock_ai():
+    # The spec makes the async methods AsyncMocks and rejects unknown attributes
+    return Mock(spec=AIProvider)
 
 
 @pytest.fixture
-def mock_ai():
-    ai = Mock()
-    ai.prompt = AsyncMock()
-    ai.prompt_mini = AsyncMock()
-    return ai
+def game_engine(mock_config, fake_db, mock_ai):
+    return GameEngine(mock_config, "test_instance", ai=mock_ai, db=fake_db)
 
 
-@pytest.fixture
-def game_engine(mock_config, mock_db, mock_ai):
-    return GameEngine(mock_config, "test_instance", ai=mock_ai, db=mock_db)
+def make_action(user_id: int, message_id: int, content: str) -> GameContext:
+    return GameContext(
+        user_id=user_id,
+        user_name=f"player_{user_id}",
+        message_content=content,
+        message_id=message_id,
+        reply_to_message_id=None,
+        force_feed=True,
+    )
 
 
 @pytest.mark.asyncio
 async def test_is_game_action_accepts_valid_action(game_engine):
-    game_engine._ai.prompt_mini.return_value = Mock(confidence=0.8, forward=True)
+    game_engine._ai.prompt_mini.return_value = _ACCEPT
 
-    result = await game_engine.is_game_action("take sword")
+    result = await game_engine.is_game_action("take the sword")
 
     assert result is True
     game_engine._ai.prompt_mini.assert_called_once()
@@ -83,7 +80,7 @@ async def test_is_game_action_accepts_valid_action(game_engine):
 
 @pytest.mark.asyncio
 async def test_is_game_action_rejects_invalid_action(game_engine):
-    game_engine._ai.prompt_mini.return_value = Mock(confidence=0.8, forward=False)
+    game_engine._ai.prompt_mini.return_value = _REJECT
 
     result = await game_engine.is_game_action("hello everyone")
 
@@ -91,6 +88,15 @@ async def test_is_game_action_rejects_invalid_action(game_engine):
     game_engine._ai.prompt_mini.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_is_game_action_short_circuits_known_messages(game_engine):
+    assert await game_engine.is_game_action("Take sword") is True
+    assert await game_engine.is_game_action("hello") is False
+    assert await game_engine.is_game_action("/show world") is False
+
+    game_engine._ai.prompt_mini.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_process_message_filtered_message(game_engine):
     game_engine.is_game_action = AsyncMock(return_value=False)
@@ -108,6 +114,23 @@ async def test_process_message_filtered_message(game_engine):
     game_engine.is_game_action.assert_called_once_with("hello")
 
 
+@pytest.mark.asyncio
+async def test_process_message_with_precomputed_verdict(game_engine):
+    game_engine.is_game_action = AsyncMock(return_value=True)
+    context = GameContext(
+        user_id=1,
+        user_name="test_user",
+        message_content="hello",
+        message_id=1,
+        reply_to_message_id=None,
+    )
+
+    result = await game_engine.process_message(context, is_action=False)
+
+    assert result is None
+    game_engine.is_game_action.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_process_message_valid_game_action(game_engine):
     # Setup mocks
@@ -183,3 +206,106 @@ def test_update_cached_state(game_engine):
     assert "removed_item" not in game_engine._world_state
     assert "sword" in game_engine._player_inventories[1]
     assert "shield" not in game_engine._player_inventories[1]
+
+
+def test_reactions_reuse_cached_user_id(game_engine, fake_db_connection):
+    fake_db_connection.messages[5] = Message(
+        id=5,
+        upstream_id=5,
+        sender_id=0,
+        content="You took the sword",
+        reply_to=1,
+        created_at="",
+        status=MessageStatus.UNFILTERED,
+    )
+
+    game_engine.record_response_reaction(5, 1, "test_user", "👍")
+    game_engine.unrecord_response_reaction(5, 1, "test_user", "👍")
+    game_engine.record_response_reaction(5, 1, "test_user", "👎")
+
+    assert fake_db_connection.user_lookups == 1
+    assert fake_db_connection.reactions == {(5, 1, "👎")}
+
+
+def test_trim_to_budget():
+    context = [
+        SimpleMessage(id=i, sender="p", sender_id=1, content="x" * 38) for i in range(5)
+    ]
+    per_message = context[0].token_estimate
+
+    assert _trim_to_budget(context, per_message * 10) == context
+    assert [m.id for m in _trim_to_budget(context, per_message * 2 + 1)] == [3, 4]
+    assert not _trim_to_budget(context, per_message - 1)
+
+
+@pytest.mark.asyncio
+async def test_overlapping_messages_persist_independently(
+    mock_config, mock_ai, file_db
+):
+    engine = GameEngine(mock_config, "test_instance", ai=mock_ai, db=file_db)
+    first_started = asyncio.Event()
+    release_first = asyncio.Event()
+
+    async def prompt(user, _system, _model):
+        if user == "light a fire":
+            first_started.set()
+            await release_first.wait()
+            raise ValueError("model failed")
+        return GameModelResponse(
+            response="You dig a hole",
+            world_state_updates={"hole": True},
+            player_inventory_updates={"shovel": True},
+        )
+
+    mock_ai.prompt.side_effect = prompt
+
+    # The first message is still waiting on the model while the second one completes
+    first = asyncio.create_task(
+        engine.process_message(make_action(111, 1, "light a fire"))
+    )
+    await first_started.wait()
+    second = await engine.process_message(make_action(222, 2, "dig a hole"))
+    release_first.set()
+    with pytest.raises(ValueError):
+        await first
+
+    assert second is not None
+    assert "hole" in engine.world_state
+    with file_db.connect() as db:
+        assert "hole" in db.load_world_state()
+        assert db.get_message(1) is not None
+        assert db.get_message(2) is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_message_does_not_share_user_id(mock_config, mock_ai, file_db):
+    engine = GameEngine(mock_config, "test_instance", ai=mock_ai, db=file_db)
+
+    mock_ai.prompt.side_effect = ValueError("model failed")
+    with pytest.raises(ValueError):
+        await engine.process_message(make_action(111, 1, "light a fire"))
+
+    mock_ai.prompt.side_effect = None
+    mock_ai.prompt.return_value = GameModelResponse(
+        response="You pick up a shovel",
+        world_state_updates=None,
+        player_inventory_updates={"shovel": True},
+    )
+    await engine.process_message(make_action(222, 2, "pick up a shovel"))
+
+    assert engine._user_ids[111] != engine._user_ids[222]
+    assert "shovel" not in engine.player_inventory(111)
+    assert "shovel" in engine.player_inventory(222)
+
+
+def test_user_id_cached_only_after_commit(mock_config, mock_ai, file_db):
+    engine = GameEngine(mock_config, "test_instance", ai=mock_ai, db=file_db)
+
+    with pytest.raises(RuntimeError):
+        with file_db.connect():
+            engine.player_inventory(111)
+            assert 111 not in engine._user_ids
+            raise RuntimeError("rolled back")
+
+    engine.player_inventory(222)
+    assert list(engine._user_ids) == [222]
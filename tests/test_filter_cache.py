@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from fun_game.game.filter_cache import FilterCache
+from fun_game.game.prompts import FilterModelResponse
+
+
+def test_hit_on_normalized_message():
+    cache = FilterCache()
+    response = FilterModelResponse(forward=True, confidence=0.9)
+
+    assert cache.get("Take Sword ") is None
+    cache.put("Take Sword ", response)
+
+    assert cache.get("take sword") is response
+    assert cache.get("take   sword\n") is response
+    assert cache.stats == {"hits": 2, "misses": 1}
+
+
+def test_low_confidence_not_cached():
+    cache = FilterCache(min_confidence=0.8)
+    cache.put("hmm", FilterModelResponse(forward=True, confidence=0.5))
+
+    assert cache.get("hmm") is None
+
+
+def test_eviction_and_expiry():
+    cache = FilterCache(max_size=2, ttl=10)
+    response = FilterModelResponse(forward=False, confidence=1.0)
+
+    with patch("fun_game.game.filter_cache.time.monotonic", return_value=0):
+        cache.put("a", response)
+        cache.put("b", response)
+        cache.get("a")
+        cache.put("c", response)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is response
+
+    with patch("fun_game.game.filter_cache.time.monotonic", return_value=11):
+        assert cache.get("a") is None
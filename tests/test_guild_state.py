@@ -0,0 +1,53 @@
+import asyncio
+from collections import deque
+import logging
+from unittest.mock import Mock
+
+import pytest
+
+from fun_game.frontends.discord import GuildState
+from fun_game.game import GameEngine
+
+
+def make_guild_state(**kwargs) -> GuildState:
+    return GuildState(guild_id=1, game_engine=Mock(spec=GameEngine), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_get_messages_caps_batch_size():
+    guild_state = make_guild_state()
+    messages = [Mock(id=i) for i in range(5)]
+    for message in messages:
+        guild_state.put_message(message)
+
+    assert await guild_state.get_messages(2) == messages[:2]
+    # Messages are left, so the next call doesn't wait
+    assert guild_state.has_messages.is_set()
+    assert await guild_state.get_messages(16) == messages[2:]
+    assert not guild_state.has_messages.is_set()
+
+
+@pytest.mark.asyncio
+async def test_get_messages_waits_for_a_message():
+    guild_state = make_guild_state()
+    waiter = asyncio.create_task(guild_state.get_messages(16))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    message = Mock(id=1)
+    guild_state.put_message(message)
+
+    assert await waiter == [message]
+
+
+@pytest.mark.asyncio
+async def test_put_message_drops_oldest_when_full(caplog):
+    guild_state = make_guild_state(message_queue=deque(maxlen=2))
+
+    with caplog.at_level(logging.WARNING, logger="bot.guild_state"):
+        for i in range(3):
+            guild_state.put_message(Mock(id=i))
+
+    assert [message.id for message in await guild_state.get_messages(16)] == [1, 2]
+    assert len(caplog.records) == 1
+    assert "dropping message 0" in caplog.records[0].getMessage()
@@ -0,0 +1,90 @@
+# pylint: disable=redefined-outer-name
+
+import logging
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from fun_game.frontends.discord import GuildState
+from fun_game.frontends.discord.cogs import message_handler
+from fun_game.frontends.discord.cogs.message_handler import MessageHandler
+from fun_game.game import GameEngine
+
+BOT_USER_ID = 99
+
+
+def make_message(
+    message_id: int,
+    content: str,
+    *,
+    bot: bool = False,
+    mentions: list | None = None,
+    reference_id: int | None = None,
+) -> Mock:
+    message = Mock()
+    message.id = message_id
+    message.content = content
+    message.author.id = 1000 + message_id
+    message.author.bot = bot
+    message.author.display_name = f"player_{message_id}"
+    message.mentions = mentions or []
+    message.reference = Mock(message_id=reference_id) if reference_id else None
+    message.channel.fetch_message = AsyncMock(side_effect=RuntimeError("not found"))
+    return message
+
+
+@pytest.fixture
+def handler():
+    bot = Mock()
+    bot.user = Mock(id=BOT_USER_ID)
+    return MessageHandler(bot)
+
+
+@pytest.fixture
+def guild_state():
+    engine = Mock(spec=GameEngine)
+
+    async def is_game_action(content: str) -> bool:
+        if content == "explode":
+            raise RuntimeError("filter failed")
+        return content == "look around"
+
+    engine.is_game_action.side_effect = is_game_action
+    return GuildState(guild_id=1, game_engine=engine)
+
+
+@pytest.mark.asyncio
+async def test_handle_messages_pairs_verdicts_with_messages(
+    handler, guild_state, monkeypatch, caplog
+):
+    handled = AsyncMock()
+    monkeypatch.setattr(message_handler, "do_handle_message", handled)
+
+    messages = [
+        make_message(1, "beep", bot=True),
+        # Fetching the replied-to message fails, so no context can be made
+        make_message(2, "reply", reference_id=50),
+        make_message(3, "hello"),
+        make_message(4, "forced", mentions=[Mock(id=BOT_USER_ID)]),
+        make_message(5, "explode"),
+        make_message(6, "look around"),
+    ]
+
+    with caplog.at_level(logging.ERROR, logger="bot.cogs.message_handler"):
+        await handler.handle_messages(messages, guild_state)
+
+    verdicts = [
+        (call.args[0].id, call.args[2].force_feed, call.kwargs["is_action"])
+        for call in handled.await_args_list
+    ]
+    assert verdicts == [(3, False, False), (4, True, True), (6, False, True)]
+    # Forced messages skip the filter
+    classified = [
+        call.args[0] for call in guild_state.game_engine.is_game_action.await_args_list
+    ]
+    assert sorted(classified) == ["explode", "hello", "look around"]
+    # Each failure is logged on its own
+    errors = [record.getMessage() for record in caplog.records]
+    assert len(errors) == 2
+    assert "not found" in errors[0]
+    assert "filter failed" in errors[1]
@@ -5,6 +5,8 @@ from fun_game.game.prompts import (
     GameModelResponse,
     make_filter_system_prompt,
     make_game_system_prompt,
+    prefilter_message,
+    _format_config_sections,
     _format_list,
 )
 
@@ -20,6 +22,22 @@ def test_make_filter_system_prompt():
     assert "hello everyone" in result
 
 
+def test_prefilter_message():
+    known = {"take sword": True, "database is locked": False}
+
+    assert prefilter_message("/show world", known) == FilterModelResponse(
+        forward=False, confidence=1.0
+    )
+    assert prefilter_message("   ", known) is not None
+    assert prefilter_message(" Take Sword", known) == FilterModelResponse(
+        forward=True, confidence=1.0
+    )
+    assert prefilter_message("Database is locked", known) == FilterModelResponse(
+        forward=False, confidence=1.0
+    )
+    assert prefilter_message("I climb the tree", known) is None
+
+
 def test_make_game_system_prompt():
     config = EngineConfig(
         world_properties=["gravity exists"],
@@ -41,9 +59,18 @@ def test_make_game_system_prompt():
         context=context,
     )
 
-    assert isinstance(result, str)
-    assert "gravity exists" in result
-    assert "TestPlayer" in result
+    assert isinstance(result, list)
+    static_body, volatile_tail = result
+    assert "gravity exists" in static_body
+    assert "TestPlayer" not in static_body
+    assert "TestPlayer" in volatile_tail
+    # Sections stay separated across the block boundary
+    assert "".join(result).startswith(
+        static_body
+        + "\n\n---\n\nYou are currently processing messages from the player named TestPlayer."
+    )
+    # Volatile sections come last so that the prefix stays byte-identical
+    assert volatile_tail.index("tree exists") < volatile_tail.index("Player1: hello")
 
     # Test sudo mode
     sudo_result = make_game_system_prompt(
@@ -55,8 +82,47 @@ def test_make_game_system_prompt():
         sudo=True,
     )
 
-    assert isinstance(sudo_result, str)
-    assert "game designer" in sudo_result
+    assert sudo_result[0] == static_body
+    assert "game designer" in sudo_result[1]
+
+
+def test_static_body_is_memoized():
+    config = EngineConfig(
+        world_properties=["gravity exists"],
+        core_mechanics=["players can move"],
+        interaction_rules=InteractionRulesConfig(do=["be nice"], dont=["Be mean"]),
+        response_guidelines=["be clear"],
+    )
+
+    bodies = [
+        make_game_system_prompt(
+            config=config,
+            world_state=[],
+            player_name=player_name,
+            player_inventory=[],
+            context=[],
+            custom_rules=["no flying"],
+        )[0]
+        for player_name in ("PlayerA", "PlayerB")
+    ]
+
+    # The same rendered string is returned rather than being rebuilt
+    assert bodies[0] is bodies[1]
+    body = bodies[0]
+    assert "DO NOT be mean" in body
+    assert "- no flying" in body
+
+    # Adding a custom rule re-renders the body but not the config sections
+    with_rule = make_game_system_prompt(
+        config=config,
+        world_state=[],
+        player_name="PlayerA",
+        player_inventory=[],
+        context=[],
+        custom_rules=["no flying", "no swimming"],
+    )[0]
+    assert "- no swimming" in with_rule
+    assert _format_config_sections(config) is _format_config_sections(config)
 
 
 def test_format_list():